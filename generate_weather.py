@@ -15,6 +15,8 @@ Output:
 
 import sys
 import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -24,6 +26,23 @@ from video_renderer import generate_video
 OUTPUT_DIR = Path(__file__).parent / "output"
 
 
+def generate_city_video(city_key: str):
+    """Fetch data and render the video for one city. Returns None on failure."""
+    try:
+        print(f"\n--- Processing {city_key.upper()} ---")
+        
+        # Fetch forecast data
+        forecast = fetch_forecast(city_key)
+        
+        # Generate video (3-day forecast only)
+        return generate_video(city_key, forecast)
+        
+    except Exception as e:
+        print(f"✗ Failed to generate {city_key}: {e}")
+        traceback.print_exc()
+        return None
+
+
 def generate_all_videos():
     """Generate weather videos for all cities."""
     start_time = time.time()
@@ -33,23 +52,12 @@ def generate_all_videos():
     print(f"{'='*50}\n")
     
     cities = ["austin", "london"]
-    generated = []
     
-    for city_key in cities:
-        try:
-            print(f"\n--- Processing {city_key.upper()} ---")
-            
-            # Fetch forecast data
-            forecast = fetch_forecast(city_key)
-            
-            # Generate video (3-day forecast only)
-            output_path = generate_video(city_key, forecast)
-            generated.append(output_path)
-            
-        except Exception as e:
-            print(f"✗ Failed to generate {city_key}: {e}")
-            import traceback
-            traceback.print_exc()
+    # Cities are independent; heavy lifting happens in the API and
+    # ffmpeg, so threads are enough here
+    with ThreadPoolExecutor(max_workers=len(cities)) as executor:
+        results = list(executor.map(generate_city_video, cities))
+    generated = [path for path in results if path is not None]
     
     elapsed = time.time() - start_time
     
@@ -3,10 +3,15 @@ Video Renderer - Generates 90s Weather Channel style images and videos
 """
 
 import os
+import sys
+import math
+import shutil
+import functools
 import subprocess
 from pathlib import Path
 from datetime import datetime
 from zoneinfo import ZoneInfo
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
 # City timezones
@@ -25,6 +30,8 @@ WIDTH = 640
 HEIGHT = 480
 FPS = 30
 DURATION = 20
+FORECAST_SECONDS = 10  # Forecast cards first when a map follows
+MAP_FRAMES = 10        # One map frame per second for the rest
 
 # Colors (90s Weather Channel palette)
 COLORS = {
@@ -46,43 +53,63 @@ def hex_to_rgb(hex_color: str) -> tuple:
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
 
+# Palette pre-parsed once - use these in draw calls
+COLORS_RGB = {name: hex_to_rgb(value) for name, value in COLORS.items()}
+
+
+# Candidate system fonts, first one that loads wins
+FONT_PATHS = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/System/Library/Fonts/Helvetica.ttc",
+    "/Library/Fonts/Arial Bold.ttf",
+]
+_EXISTING_FONT_PATHS = [p for p in FONT_PATHS if os.path.exists(p)]  # Checked once
+
+
+@functools.lru_cache(maxsize=32)
 def get_font(size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
-    """Get a font - uses system fonts with fallback."""
-    font_paths = [
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-        "/System/Library/Fonts/Helvetica.ttc",
-        "/Library/Fonts/Arial Bold.ttf",
-    ]
-    
-    for path in font_paths:
-        if os.path.exists(path):
-            try:
-                return ImageFont.truetype(path, size)
-            except:
-                continue
+    """
+    Get a font - uses system fonts with fallback (cached per size).
+    bold is currently ignored: every candidate font is already a bold face.
+    """
+    for path in _EXISTING_FONT_PATHS:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
     
     # Fallback to default
     return ImageFont.load_default()
 
 
-def draw_gradient_bg(draw: ImageDraw.Draw, width: int, height: int):
-    """Draw blue gradient background."""
-    top = hex_to_rgb(COLORS["bg_dark"])
-    bottom = hex_to_rgb(COLORS["bg_light"])
-    
-    for y in range(height):
-        ratio = y / height
-        r = int(top[0] + (bottom[0] - top[0]) * ratio)
-        g = int(top[1] + (bottom[1] - top[1]) * ratio)
-        b = int(top[2] + (bottom[2] - top[2]) * ratio)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
+def _make_gradient_image(width: int, height: int) -> Image.Image:
+    """Build the blue gradient background as a single image."""
+    top = np.array(COLORS_RGB["bg_dark"], dtype=np.float32)
+    bottom = np.array(COLORS_RGB["bg_light"], dtype=np.float32)
+    
+    # One color per row, then broadcast across the width
+    ratio = (np.arange(height, dtype=np.float32) / height)[:, None]
+    rows = (top + (bottom - top) * ratio).astype(np.uint8)
+    arr = np.broadcast_to(rows[:, None, :], (height, width, 3)).copy()
+    return Image.fromarray(arr)  # uint8 (H, W, 3) is inferred as RGB
+
 
+# Background shared by every frame - copy it, never draw on it directly
+_BG = _make_gradient_image(WIDTH, HEIGHT)
 
-def draw_header(draw: ImageDraw.Draw, city: str, region: str):
+
+def get_local_time_strings(city: str) -> tuple:
+    """Get (time, date) header strings in the city's LOCAL timezone."""
+    tz_name = TIMEZONES.get(city, "UTC")
+    now = datetime.now(ZoneInfo(tz_name))
+    return now.strftime("%I:%M:%S %p"), now.strftime("%a %b %d").upper()
+
+
+def draw_header(draw: ImageDraw.Draw, city: str, region: str, time_str: str, date_str: str):
     """Draw header with city name centered (logo moved to bottom)."""
     # Orange header bar
-    draw.rectangle([0, 0, WIDTH, 50], fill=hex_to_rgb(COLORS["header_orange"]))
+    draw.rectangle([0, 0, WIDTH, 50], fill=COLORS_RGB["header_orange"])
     
     font_medium = get_font(12)
     font_title = get_font(24)
@@ -91,23 +118,17 @@ def draw_header(draw: ImageDraw.Draw, city: str, region: str):
     city_text = f"{city} {region}"
     city_width = draw.textlength(city_text, font=font_title)
     city_x = (WIDTH - city_width) // 2
-    draw.text((city_x, 8), city_text, fill=hex_to_rgb(COLORS["text_white"]), font=font_title)
+    draw.text((city_x, 8), city_text, fill=COLORS_RGB["text_white"], font=font_title)
     
     ext_text = "Extended Forecast"
     ext_width = draw.textlength(ext_text, font=font_medium)
     ext_x = (WIDTH - ext_width) // 2
-    draw.text((ext_x, 32), ext_text, fill=hex_to_rgb(COLORS["text_yellow"]), font=font_medium)
-    
-    # Time and date in LOCAL timezone for the city
-    tz_name = TIMEZONES.get(city, "UTC")
-    local_tz = ZoneInfo(tz_name)
-    now = datetime.now(local_tz)
-    time_str = now.strftime("%I:%M:%S %p")
-    date_str = now.strftime("%a %b %d").upper()
+    draw.text((ext_x, 32), ext_text, fill=COLORS_RGB["text_yellow"], font=font_medium)
     
+    # Time and date - computed once per video so frames stay identical
     font_time = get_font(14)
-    draw.text((456, 10), time_str, fill=hex_to_rgb(COLORS["text_white"]), font=font_time)
-    draw.text((456, 28), date_str, fill=hex_to_rgb(COLORS["text_white"]), font=font_time)
+    draw.text((456, 10), time_str, fill=COLORS_RGB["text_white"], font=font_time)
+    draw.text((456, 28), date_str, fill=COLORS_RGB["text_white"], font=font_time)
 
 
 def draw_logo(draw: ImageDraw.Draw, y: int):
@@ -117,8 +138,8 @@ def draw_logo(draw: ImageDraw.Draw, y: int):
     logo_x = (WIDTH - logo_width) // 2
     
     draw.rectangle([logo_x, y, logo_x + logo_width, y + 38], 
-                   fill=hex_to_rgb(COLORS["bg_dark"]), 
-                   outline=hex_to_rgb(COLORS["text_white"]), width=2)
+                   fill=COLORS_RGB["bg_dark"], 
+                   outline=COLORS_RGB["text_white"], width=2)
     
     font_small = get_font(9)
     
@@ -126,56 +147,56 @@ def draw_logo(draw: ImageDraw.Draw, y: int):
     for i, text in enumerate(["THE", "WEATHER", "CHANNEL"]):
         text_width = draw.textlength(text, font=font_small)
         text_x = logo_x + (logo_width - text_width) // 2
-        draw.text((text_x, y + 4 + i * 10), text, fill=hex_to_rgb(COLORS["text_white"]), font=font_small)
+        draw.text((text_x, y + 4 + i * 10), text, fill=COLORS_RGB["text_white"], font=font_small)
 
 
-def draw_forecast_card(draw: ImageDraw.Draw, x: int, y: int, 
+def draw_forecast_card(img: Image.Image, x: int, y: int, 
                        day_name: str, icon: str, description: str,
                        high: int, low: int, unit: str):
     """Draw a single forecast card."""
+    draw = ImageDraw.Draw(img)
     card_width = 180
     card_height = 280
     
     # Card background with border
     draw.rectangle([x, y, x + card_width, y + card_height], 
-                   fill=hex_to_rgb(COLORS["card_fill"]),
-                   outline=hex_to_rgb(COLORS["card_border"]), width=3)
+                   fill=COLORS_RGB["card_fill"],
+                   outline=COLORS_RGB["card_border"], width=3)
     
     # Day name header
     font_day = get_font(28)
     day_width = draw.textlength(day_name, font=font_day)
     draw.text((x + (card_width - day_width) // 2, y + 10), 
-              day_name, fill=hex_to_rgb(COLORS["text_yellow"]), font=font_day)
+              day_name, fill=COLORS_RGB["text_yellow"], font=font_day)
     
     # Weather icon (placeholder - draw simple shapes)
     icon_y = y + 50
-    draw_weather_icon(draw, x + card_width // 2, icon_y + 40, icon)
+    draw_weather_icon(img, x + card_width // 2, icon_y + 40, icon)
     
     # Description
     font_desc = get_font(16)
     desc_width = draw.textlength(description, font=font_desc)
     draw.text((x + (card_width - desc_width) // 2, y + 150),
-              description, fill=hex_to_rgb(COLORS["text_white"]), font=font_desc)
+              description, fill=COLORS_RGB["text_white"], font=font_desc)
     
     # Hi/Lo labels
     font_label = get_font(14)
-    draw.text((x + 30, y + 190), "Lo", fill=hex_to_rgb(COLORS["text_gray"]), font=font_label)
-    draw.text((x + 110, y + 190), "Hi", fill=hex_to_rgb(COLORS["text_gray"]), font=font_label)
+    draw.text((x + 30, y + 190), "Lo", fill=COLORS_RGB["text_gray"], font=font_label)
+    draw.text((x + 110, y + 190), "Hi", fill=COLORS_RGB["text_gray"], font=font_label)
     
     # Temperatures
     font_temp = get_font(36)
-    draw.text((x + 20, y + 210), str(low), fill=hex_to_rgb(COLORS["text_white"]), font=font_temp)
-    draw.text((x + 100, y + 210), str(high), fill=hex_to_rgb(COLORS["text_white"]), font=font_temp)
+    draw.text((x + 20, y + 210), str(low), fill=COLORS_RGB["text_white"], font=font_temp)
+    draw.text((x + 100, y + 210), str(high), fill=COLORS_RGB["text_white"], font=font_temp)
 
 
-def draw_weather_icon(draw: ImageDraw.Draw, cx: int, cy: int, icon_type: str):
-    """Draw a simple weather icon centered at (cx, cy)."""
+def _draw_icon_shapes(draw: ImageDraw.Draw, cx: int, cy: int, icon_type: str):
+    """Draw a simple weather icon's shapes centered at (cx, cy)."""
     if icon_type == "sun":
         # Yellow sun
         draw.ellipse([cx-25, cy-25, cx+25, cy+25], fill="#ffd54f")
         # Sun rays
         for angle in range(0, 360, 45):
-            import math
             rad = math.radians(angle)
             x1 = cx + int(30 * math.cos(rad))
             y1 = cy + int(30 * math.sin(rad))
@@ -223,27 +244,51 @@ def draw_weather_icon(draw: ImageDraw.Draw, cx: int, cy: int, icon_type: str):
             draw.ellipse([cx+i-3, cy+28, cx+i+3, cy+34], fill="#ffffff")
 
 
+# Sprite canvas - large enough for the sun's rays (radius 40 + line width)
+ICON_SIZE = 96
+
+
+def _rasterize_icon(icon_type: str) -> Image.Image:
+    """Draw an icon once onto a transparent sprite."""
+    sprite = Image.new("RGBA", (ICON_SIZE, ICON_SIZE), (0, 0, 0, 0))
+    _draw_icon_shapes(ImageDraw.Draw(sprite), ICON_SIZE // 2, ICON_SIZE // 2, icon_type)
+    return sprite
+
+
+# Icons are static, so every frame pastes these instead of redrawing shapes
+_ICON_CACHE = {name: _rasterize_icon(name) 
+               for name in ("sun", "clouds", "rain", "thunderstorm", "snow")}
+
+
+def draw_weather_icon(img: Image.Image, cx: int, cy: int, icon_type: str):
+    """Paste a weather icon centered at (cx, cy)."""
+    sprite = _ICON_CACHE.get(icon_type)
+    if sprite is not None:
+        img.paste(sprite, (cx - ICON_SIZE // 2, cy - ICON_SIZE // 2), sprite)
+
+
 def draw_bottom_bar(draw: ImageDraw.Draw, text: str):
     """Draw bottom info bar (moved up to make room for logo above)."""
     bar_top = HEIGHT - 64  # Moved up another 5% (~24px)
-    draw.rectangle([0, bar_top, WIDTH, HEIGHT], fill=hex_to_rgb(COLORS["bar_blue"]))
+    draw.rectangle([0, bar_top, WIDTH, HEIGHT], fill=COLORS_RGB["bar_blue"])
     
     font = get_font(14)
     text_width = draw.textlength(text, font=font)
     draw.text(((WIDTH - text_width) // 2, bar_top + 12), 
-              text, fill=hex_to_rgb(COLORS["text_white"]), font=font)
+              text, fill=COLORS_RGB["text_white"], font=font)
 
 
-def generate_forecast_frame(forecast: dict) -> Image.Image:
-    """Generate the forecast cards frame."""
-    img = Image.new("RGB", (WIDTH, HEIGHT))
-    draw = ImageDraw.Draw(img)
+def generate_forecast_frame(forecast: dict, time_str: str = None, 
+                            date_str: str = None) -> Image.Image:
+    """Generate the forecast cards frame (header clock defaults to now, local time)."""
+    if time_str is None or date_str is None:
+        time_str, date_str = get_local_time_strings(forecast["city"])
     
-    # Background
-    draw_gradient_bg(draw, WIDTH, HEIGHT)
+    img = _BG.copy()
+    draw = ImageDraw.Draw(img)
     
     # Header
-    draw_header(draw, forecast["city"], forecast["region"])
+    draw_header(draw, forecast["city"], forecast["region"], time_str, date_str)
     
     # Three forecast cards
     card_start_x = 30
@@ -252,7 +297,7 @@ def generate_forecast_frame(forecast: dict) -> Image.Image:
     
     for i, day in enumerate(forecast["forecasts"][:3]):
         draw_forecast_card(
-            draw, 
+            img, 
             card_start_x + i * card_spacing, 
             card_y,
             day["day_name"],
@@ -272,110 +317,208 @@ def generate_forecast_frame(forecast: dict) -> Image.Image:
     return img
 
 
-def generate_map_frame(city_key: str, nearby: list, frame_num: int) -> Image.Image:
-    """Generate a map animation frame."""
-    img = Image.new("RGB", (WIDTH, HEIGHT))
-    draw = ImageDraw.Draw(img)
-    
-    # Background
-    draw_gradient_bg(draw, WIDTH, HEIGHT)
-    
-    # Simple map placeholder - draw outline
-    if city_key == "austin":
-        # US outline (simplified)
-        draw.rectangle([50, 100, 590, 380], outline=hex_to_rgb(COLORS["text_gray"]), width=2)
-        draw.text((300, 90), "UNITED STATES", fill=hex_to_rgb(COLORS["text_yellow"]), 
-                  font=get_font(20))
-        
-        # City positions (approximate screen coords)
-        positions = {
+# Map layouts (simplified outlines, approximate screen coords for cities)
+MAP_LAYOUTS = {
+    "austin": {
+        "title": "UNITED STATES",
+        "title_x": 300,
+        "positions": {
             "Austin": (280, 300),
             "Houston": (320, 320),
             "Dallas": (290, 250),
             "San Antonio": (260, 320),
             "El Paso": (150, 290),
-        }
-    else:
-        # Europe outline (simplified)
-        draw.rectangle([50, 100, 590, 380], outline=hex_to_rgb(COLORS["text_gray"]), width=2)
-        draw.text((280, 90), "WESTERN EUROPE", fill=hex_to_rgb(COLORS["text_yellow"]),
-                  font=get_font(20))
-        
-        positions = {
+        },
+    },
+    "london": {
+        "title": "WESTERN EUROPE",
+        "title_x": 280,
+        "positions": {
             "London": (200, 180),
             "Paris": (220, 240),
             "Berlin": (350, 200),
             "Amsterdam": (250, 170),
             "Brussels": (240, 210),
-        }
+        },
+    },
+}
+
+# Static map images keyed on (city_key, nearby weather)
+_MAP_BASE = {}
+
+
+def draw_map_label(draw: ImageDraw.Draw, x: int, y: int, city_data: dict, color: tuple):
+    """Draw a city's name and temperature below its icon."""
+    draw.text((x - 20, y + 45), city_data["name"], fill=color, font=get_font(12))
+    draw.text((x - 10, y + 60), f"{city_data['temp']}°", 
+              fill=color, font=get_font(16))
+
+
+def get_map_base(city_key: str, nearby: list) -> Image.Image:
+    """Get the map with outline, title, icons and unhighlighted labels."""
+    key = (city_key, tuple((c["name"], c["temp"], c["icon"]) for c in nearby))
+    if key in _MAP_BASE:
+        return _MAP_BASE[key]
     
-    # Draw cities with weather
-    font_city = get_font(12)
-    font_temp = get_font(16)
+    layout = MAP_LAYOUTS.get(city_key, MAP_LAYOUTS["london"])
+    positions = layout["positions"]
     
-    # Animate: highlight different cities based on frame
-    highlight_idx = frame_num % (len(nearby) + 1)
+    img = _BG.copy()
+    draw = ImageDraw.Draw(img)
+    
+    # Simple map placeholder - draw outline
+    draw.rectangle([50, 100, 590, 380], outline=COLORS_RGB["text_gray"], width=2)
+    draw.text((layout["title_x"], 90), layout["title"], 
+              fill=COLORS_RGB["text_yellow"], font=get_font(20))
     
-    for i, city_data in enumerate(nearby):
-        name = city_data["name"]
-        if name in positions:
-            x, y = positions[name]
-            
-            # Draw weather icon
-            draw_weather_icon(draw, x, y, city_data["icon"])
-            
-            # City name and temp
-            is_highlighted = (i == highlight_idx - 1)
-            color = COLORS["text_yellow"] if is_highlighted else COLORS["text_white"]
-            
-            draw.text((x - 20, y + 45), name, fill=hex_to_rgb(color), font=font_city)
-            draw.text((x - 10, y + 60), f"{city_data['temp']}°", 
-                     fill=hex_to_rgb(color), font=font_temp)
+    # Draw cities with weather
+    for city_data in nearby:
+        if city_data["name"] in positions:
+            x, y = positions[city_data["name"]]
+            draw_weather_icon(img, x, y, city_data["icon"])
+            draw_map_label(draw, x, y, city_data, COLORS_RGB["text_white"])
     
     # Bottom bar
     draw_bottom_bar(draw, "REGIONAL CONDITIONS")
     
+    _MAP_BASE[key] = img
+    return img
+
+
+def highlight_map_city(base: Image.Image, city_key: str, city_data: dict) -> Image.Image:
+    """Copy the map base and redraw one city's label in yellow."""
+    img = base.copy()
+    positions = MAP_LAYOUTS.get(city_key, MAP_LAYOUTS["london"])["positions"]
+    if city_data["name"] in positions:
+        x, y = positions[city_data["name"]]
+        draw_map_label(ImageDraw.Draw(img), x, y, city_data, COLORS_RGB["text_yellow"])
     return img
 
 
+def generate_map_frame(city_key: str, nearby: list, frame_num: int) -> Image.Image:
+    """Generate a map animation frame."""
+    base = get_map_base(city_key, nearby)
+    
+    # Animate: highlight different cities based on frame (0 = none)
+    highlight_idx = frame_num % (len(nearby) + 1)
+    if highlight_idx == 0:
+        return base.copy()
+    return highlight_map_city(base, city_key, nearby[highlight_idx - 1])
+
+
+def generate_map_variants(city_key: str, nearby: list) -> list:
+    """
+    Generate every distinct map frame from one base image.
+    Index matches generate_map_frame's highlight cycle (0 = none).
+    """
+    base = get_map_base(city_key, nearby)
+    return [base.copy()] + [highlight_map_city(base, city_key, city_data) 
+                            for city_data in nearby]
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoder_args() -> tuple:
+    """Pick the fastest available H.264 encoder (checked once per process)."""
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                capture_output=True, text=True, check=True)
+        encoders = result.stdout
+    except (OSError, subprocess.CalledProcessError):
+        encoders = ""
+    
+    if sys.platform == "darwin" and "h264_videotoolbox" in encoders:
+        return ("-c:v", "h264_videotoolbox", "-b:v", "2M")
+    if "h264_nvenc" in encoders and shutil.which("nvidia-smi"):
+        return ("-c:v", "h264_nvenc", "-preset", "p1", "-cq", "23")
+    
+    # Software fallback - our frames are mostly held stills
+    return ("-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage", "-crf", "23")
+
+
 def generate_video(city_key: str, forecast: dict, nearby: list = None):
-    """Generate the complete weather video - 20 seconds of 3-day forecast."""
+    """
+    Generate the complete weather video.
+    20 seconds of 3-day forecast, or 10s forecast + 10s map if nearby given.
+    """
     output_name = "ATXweather.mp4" if city_key == "austin" else "LDNweather.mp4"
     output_path = OUTPUT_DIR / output_name
-    temp_dir = OUTPUT_DIR / f"temp_{city_key}"
-    temp_dir.mkdir(exist_ok=True)
     
     print(f"Generating {output_name}...")
     
-    # Generate forecast frame (held for full 20 seconds)
-    forecast_img = generate_forecast_frame(forecast)
-    forecast_path = temp_dir / "forecast.png"
-    forecast_img.save(forecast_path)
+    # (raw RGB frame, seconds to hold it)
+    forecast_seconds = FORECAST_SECONDS if nearby else DURATION
+    time_str, date_str = get_local_time_strings(forecast["city"])
+    forecast_img = generate_forecast_frame(forecast, time_str, date_str)
+    segments = [(forecast_img.tobytes(), forecast_seconds)]
     
-    # Create video with ffmpeg - single image for 20 seconds
+    if nearby:
+        map_hold = (DURATION - FORECAST_SECONDS) // MAP_FRAMES
+        
+        # Highlight cycles through len(nearby) + 1 states, so render each
+        # distinct frame once from a single base and reuse it as the cycle repeats
+        variants = [img.tobytes() for img in generate_map_variants(city_key, nearby)]
+        
+        for i in range(MAP_FRAMES):
+            segments.append((variants[i % len(variants)], map_hold))
+    
+    # Keyframe at every cut. The long GOP only covers held frames, and
+    # libx264 ultrafast has scene-cut detection off, so cuts must be forced
+    cut_times, elapsed = [], 0
+    for _, seconds in segments[:-1]:
+        elapsed += seconds
+        cut_times.append(str(elapsed))
+    keyframe_args = ["-force_key_frames", ",".join(cut_times)] if cut_times else []
+    
+    # Stream raw frames straight into ffmpeg - no temp files. Input runs at
+    # 1fps (one frame per second of video); CFR output duplicates up to FPS
     cmd = [
         "ffmpeg", "-y",
-        "-loop", "1",
-        "-i", str(forecast_path),
-        "-t", str(DURATION),
-        "-vf", f"fps={FPS},format=yuv420p",
-        "-c:v", "libx264",
-        "-preset", "medium",
-        "-crf", "23",
+        "-loglevel", "error",
+        "-f", "rawvideo",
+        "-pix_fmt", "rgb24",
+        "-s", f"{WIDTH}x{HEIGHT}",
+        "-r", "1",
+        "-i", "-",
+        *get_encoder_args(),
+        "-g", str(DURATION * FPS),  # Held frames cost ~nothing between keyframes
+        *keyframe_args,
+        "-r", str(FPS),
+        "-vsync", "cfr",  # Deprecated for -fps_mode, but that needs ffmpeg 5.1+
+        "-t", str(DURATION),  # Pin length exactly (see spare frame below)
+        "-pix_fmt", "yuv420p",
         str(output_path)
     ]
     
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    finished = False
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        print(f"✓ Generated {output_path}")
-    except subprocess.CalledProcessError as e:
-        print(f"✗ ffmpeg error: {e.stderr}")
-        raise
-    
-    # Cleanup temp files
-    import shutil
-    shutil.rmtree(temp_dir)
-    
+        for frame, seconds in segments:
+            for _ in range(seconds):
+                proc.stdin.write(frame)
+        
+        # One spare second of the last frame; -t trims the output back to
+        # DURATION even on ffmpeg builds that don't hold the final frame
+        proc.stdin.write(segments[-1][0])
+        finished = True
+    except BrokenPipeError:
+        finished = True  # ffmpeg exited early - its stderr says why
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        if not finished:
+            # Interrupted mid-stream - don't leave ffmpeg running
+            proc.kill()
+            proc.wait()
+    
+    stderr = proc.stderr.read().decode(errors="replace")
+    proc.stderr.close()
+    if proc.wait() != 0:
+        print(f"✗ ffmpeg error: {stderr}")
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+    
+    print(f"✓ Generated {output_path}")
     return output_path
 
 
@@ -4,8 +4,11 @@ Weather API - Fetches forecast data from OpenWeatherMap
 
 import os
 import json
+import time
 import requests
-from datetime import datetime
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -15,7 +18,27 @@ API_KEY = os.getenv("OPENWEATHERMAP_API_KEY")
 CACHE_DIR = Path(__file__).parent / "cache"
 CACHE_DIR.mkdir(exist_ok=True)
 
-# City configurations
+
+def get_env_seconds(name: str, default: int) -> int:
+    """Read a whole number of seconds from the environment, warning on bad values."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"✗ Ignoring {name}={value!r} (expected seconds), using {default}")
+        return default
+
+
+# Seconds a cached response is reused before hitting the API again (0 = always fetch)
+FORECAST_CACHE_TTL = get_env_seconds("WEATHER_CACHE_TTL", 1800)
+NEARBY_CACHE_TTL = get_env_seconds("WEATHER_NEARBY_CACHE_TTL", 600)
+
+# Shared session - keeps connections to the API alive between requests
+_SESSION = requests.Session()
+
+# City configurations (nearby "id" is the OpenWeatherMap city ID)
 CITIES = {
     "austin": {
         "lat": 30.2672,
@@ -24,10 +47,10 @@ CITIES = {
         "region": "Metro",
         "units": "imperial",  # Fahrenheit
         "nearby": [
-            {"name": "Houston", "lat": 29.7604, "lon": -95.3698},
-            {"name": "Dallas", "lat": 32.7767, "lon": -96.7970},
-            {"name": "San Antonio", "lat": 29.4241, "lon": -98.4936},
-            {"name": "El Paso", "lat": 31.7619, "lon": -106.4850},
+            {"name": "Houston", "id": 4699066, "lat": 29.7604, "lon": -95.3698},
+            {"name": "Dallas", "id": 4684888, "lat": 32.7767, "lon": -96.7970},
+            {"name": "San Antonio", "id": 4726206, "lat": 29.4241, "lon": -98.4936},
+            {"name": "El Paso", "id": 5520993, "lat": 31.7619, "lon": -106.4850},
         ]
     },
     "london": {
@@ -37,10 +60,10 @@ CITIES = {
         "region": "Metro",
         "units": "metric",  # Celsius
         "nearby": [
-            {"name": "Paris", "lat": 48.8566, "lon": 2.3522},
-            {"name": "Berlin", "lat": 52.5200, "lon": 13.4050},
-            {"name": "Amsterdam", "lat": 52.3676, "lon": 4.9041},
-            {"name": "Brussels", "lat": 50.8503, "lon": 4.3517},
+            {"name": "Paris", "id": 2988507, "lat": 48.8566, "lon": 2.3522},
+            {"name": "Berlin", "id": 2950159, "lat": 52.5200, "lon": 13.4050},
+            {"name": "Amsterdam", "id": 2759794, "lat": 52.3676, "lon": 4.9041},
+            {"name": "Brussels", "id": 2800866, "lat": 50.8503, "lon": 4.3517},
         ]
     }
 }
@@ -64,14 +87,40 @@ def get_icon_name(condition: str) -> str:
     return CONDITION_ICONS.get(condition, "clouds")
 
 
+def load_fresh_cache(cache_file: Path, ttl: int):
+    """Return cached data if it was written less than ttl seconds ago, else None."""
+    if ttl <= 0 or not cache_file.exists():
+        return None
+    
+    try:
+        with open(cache_file) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    
+    if not isinstance(data, dict):
+        return None
+    
+    # Negative age means cached_at is in the future (clock skew) - treat as stale
+    age = time.time() - data.get("cached_at", 0)
+    if 0 <= age < ttl:
+        return data
+    return None
+
+
 def fetch_forecast(city_key: str) -> dict:
     """
     Fetch 3-day forecast for a city.
-    Returns cached data if API fails.
+    Returns fresh cached data without calling the API, or cached data if API fails.
     """
     city = CITIES[city_key]
     cache_file = CACHE_DIR / f"{city_key}_forecast.json"
     
+    cached = load_fresh_cache(cache_file, FORECAST_CACHE_TTL)
+    if cached:
+        print(f"✓ Using recent cached forecast for {city['name']}")
+        return cached
+    
     try:
         # Fetch from OpenWeatherMap One Call API 3.0
         url = "https://api.openweathermap.org/data/2.5/forecast"
@@ -83,7 +132,7 @@ def fetch_forecast(city_key: str) -> dict:
             "cnt": 24,  # 3 days of 3-hour forecasts
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = _SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
         
@@ -91,6 +140,7 @@ def fetch_forecast(city_key: str) -> dict:
         forecast = process_forecast(data, city)
         
         # Cache successful response
+        forecast["cached_at"] = time.time()
         with open(cache_file, "w") as f:
             json.dump(forecast, f)
         
@@ -136,7 +186,7 @@ def process_forecast(data: dict, city: dict) -> dict:
         temps = day["temps"]
         
         # Most common condition
-        condition = max(set(day["conditions"]), key=day["conditions"].count)
+        condition = Counter(day["conditions"]).most_common(1)[0][0]
         
         forecasts.append({
             "day_name": day["day_name"],
@@ -175,7 +225,6 @@ def get_description(condition: str) -> str:
 
 def get_fallback_forecast(city: dict) -> dict:
     """Return fallback data when API fails and no cache."""
-    from datetime import timedelta
     now = datetime.now()
     
     # Varied fallback patterns based on city and season
@@ -273,43 +322,94 @@ def get_fallback_forecast(city: dict) -> dict:
     }
 
 
+def nearby_entry(nearby: dict, data: dict) -> dict:
+    """Build a map entry from a current-weather API result."""
+    return {
+        "name": nearby["name"],
+        "lat": nearby["lat"],
+        "lon": nearby["lon"],
+        "temp": round(data["main"]["temp"]),
+        "condition": data["weather"][0]["main"],
+        "icon": get_icon_name(data["weather"][0]["main"]),
+    }
+
+
+def fetch_nearby_city(nearby: dict, units: str) -> tuple:
+    """
+    Fetch current weather for one nearby city, with fallback values.
+    Returns (entry, fetched) - fetched is False when placeholders were used.
+    """
+    try:
+        url = "https://api.openweathermap.org/data/2.5/weather"
+        params = {
+            "lat": nearby["lat"],
+            "lon": nearby["lon"],
+            "appid": API_KEY,
+            "units": units,
+        }
+        
+        response = _SESSION.get(url, params=params, timeout=10)
+        response.raise_for_status()
+        return nearby_entry(nearby, response.json()), True
+    except Exception as e:
+        print(f"  Warning: Could not fetch {nearby['name']}: {e}")
+        return {
+            "name": nearby["name"],
+            "lat": nearby["lat"],
+            "lon": nearby["lon"],
+            "temp": 70 if units == "imperial" else 21,
+            "condition": "Clouds",
+            "icon": "clouds",
+        }, False
+
+
+def fetch_nearby_group(nearby_cities: list, units: str) -> list:
+    """Fetch current weather for all nearby cities in a single request."""
+    url = "https://api.openweathermap.org/data/2.5/group"
+    params = {
+        "id": ",".join(str(nearby["id"]) for nearby in nearby_cities),
+        "appid": API_KEY,
+        "units": units,
+    }
+    
+    response = _SESSION.get(url, params=params, timeout=10)
+    response.raise_for_status()
+    results = {item["id"]: item for item in response.json()["list"]}
+    
+    # KeyError if the API left a city out - caller falls back
+    return [nearby_entry(nearby, results[nearby["id"]]) for nearby in nearby_cities]
+
+
 def fetch_nearby_weather(city_key: str) -> list:
     """Fetch current weather for nearby cities (for map)."""
     city = CITIES[city_key]
-    nearby_weather = []
+    if not city["nearby"]:
+        return []
     
-    for nearby in city["nearby"]:
-        try:
-            url = "https://api.openweathermap.org/data/2.5/weather"
-            params = {
-                "lat": nearby["lat"],
-                "lon": nearby["lon"],
-                "appid": API_KEY,
-                "units": city["units"],
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            nearby_weather.append({
-                "name": nearby["name"],
-                "lat": nearby["lat"],
-                "lon": nearby["lon"],
-                "temp": round(data["main"]["temp"]),
-                "condition": data["weather"][0]["main"],
-                "icon": get_icon_name(data["weather"][0]["main"]),
-            })
-        except Exception as e:
-            print(f"  Warning: Could not fetch {nearby['name']}: {e}")
-            nearby_weather.append({
-                "name": nearby["name"],
-                "lat": nearby["lat"],
-                "lon": nearby["lon"],
-                "temp": 70 if city["units"] == "imperial" else 21,
-                "condition": "Clouds",
-                "icon": "clouds",
-            })
+    cache_file = CACHE_DIR / f"{city_key}_nearby.json"
+    
+    cached = load_fresh_cache(cache_file, NEARBY_CACHE_TTL)
+    if cached:
+        return cached["cities"]
+    
+    try:
+        nearby_weather = fetch_nearby_group(city["nearby"], city["units"])
+        complete = True
+    except Exception as e:
+        print(f"  Warning: Group fetch failed for {city['name']}, trying cities one by one: {e}")
+        
+        # Requests are I/O bound - run them side by side, keeping city order
+        with ThreadPoolExecutor(max_workers=len(city["nearby"])) as executor:
+            results = list(executor.map(
+                lambda nearby: fetch_nearby_city(nearby, city["units"]), city["nearby"]
+            ))
+        nearby_weather = [entry for entry, _ in results]
+        complete = all(fetched for _, fetched in results)
+    
+    # Only cache real data - never placeholder fallbacks
+    if complete:
+        with open(cache_file, "w") as f:
+            json.dump({"cached_at": time.time(), "cities": nearby_weather}, f)
     
     return nearby_weather
 